@@ -0,0 +1,116 @@
+# input capture for the drawing apps
+# timestamps every drag event and drops near duplicate points (but keeps corners)
+import math
+import time
+import numpy as np
+
+CAPACITY = 1024 # preallocated points, grows if a stroke is longer
+MIN_DISTANCE = 3.0 # px, closer points are dropped
+MIN_INTERVAL = 0.0 # sec, faster points are dropped (0 = only the distance counts)
+CORNER_ANGLE = math.radians(45) # a dropped point is kept anyway if the stroke turns by more at it
+
+
+class StrokeCapture:
+    """Points of one stroke as an array of [x, y, t]"""
+
+    def __init__(self, min_distance=MIN_DISTANCE, min_interval=MIN_INTERVAL,
+                 corner_angle=CORNER_ANGLE, capacity=CAPACITY) -> None:
+        self.min_distance = min_distance
+        self.min_interval = min_interval
+        self.corner_angle = corner_angle
+        self.data = np.empty((capacity, 3), dtype=float)
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.raw_count = 0 # all events, including the dropped ones
+        self.dropped = [] # points dropped since the last kept one (corner/end candidates)
+
+    @property
+    def points(self):
+        """[x, y] of the kept points (a view, no copy)"""
+        return self.data[:self.n, :2]
+
+    @property
+    def timestamps(self):
+        return self.data[:self.n, 2]
+
+    def __len__(self):
+        return self.n
+
+    def add(self, x, y, t=None) -> list:
+        """Add a raw event, returns the points that were kept because of it: [[x, y], ...]"""
+        if t is None:
+            t = time.perf_counter()
+        self.raw_count += 1
+        point = (float(x), float(y), float(t))
+
+        if self.n == 0:
+            return [self.commit(point)]
+
+        last = self.data[self.n - 1]
+        if self.distance(last, point) >= self.min_distance and point[2] - last[2] >= self.min_interval:
+            return self.keep(point)
+        self.dropped.append(point)
+        return []
+
+    def finish(self) -> list:
+        """End of the stroke: the last point is always kept"""
+        if len(self.dropped) == 0:
+            return []
+        return self.keep(self.dropped.pop())
+
+    def keep(self, point) -> list:
+        """Commit a point, and before it the corner among the points dropped since the last one"""
+        kept = []
+        corner = self.find_corner(point)
+        if corner is not None:
+            kept.append(self.commit(corner))
+        kept.append(self.commit(point))
+        return kept
+
+    def find_corner(self, point):
+        """The dropped point furthest from the chord last -> point, if the stroke turns at it"""
+        if len(self.dropped) == 0:
+            return None
+        last = self.data[self.n - 1]
+        cx = point[0] - last[0]
+        cy = point[1] - last[1]
+        furthest = max(self.dropped, key=lambda q: abs(cx * (q[1] - last[1]) - cy * (q[0] - last[0])))
+
+        ax = furthest[0] - last[0]
+        ay = furthest[1] - last[1]
+        bx = point[0] - furthest[0]
+        by = point[1] - furthest[1]
+        if (ax == 0 and ay == 0) or (bx == 0 and by == 0):
+            return None
+        turn = abs(math.atan2(ax * by - ay * bx, ax * bx + ay * by))
+        return furthest if turn > self.corner_angle else None
+
+    def distance(self, p1, p2) -> float:
+        return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
+
+    def commit(self, point) -> list:
+        if self.n == len(self.data):
+            grown = np.empty((len(self.data) * 2, 3), dtype=float)
+            grown[:self.n] = self.data[:self.n]
+            self.data = grown
+        self.data[self.n] = point
+        self.n += 1
+        self.dropped = []
+        return [point[0], point[1]]
+
+    def velocity(self):
+        """Speed (px/sec) at every kept point, 0 for the first one"""
+        speed = np.zeros(self.n)
+        if self.n < 2:
+            return speed
+        d = np.hypot(*np.diff(self.points, axis=0).T)
+        dt = np.maximum(np.diff(self.timestamps), 1e-6)
+        speed[1:] = d / dt
+        return speed
+
+    def duration(self) -> float:
+        if self.n == 0:
+            return 0.0
+        return self.data[self.n - 1, 2] - self.data[0, 2]
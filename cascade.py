@@ -0,0 +1,119 @@
+# cascade of the two recognizers: cheap engine first, the other one only for ambiguous strokes
+import argparse
+import os
+import time
+import numpy as np
+from recognizer import Parser
+from engines import DollarEngine, LstmEngine, load_templates, TEST_OWN_PATH
+
+TARGET_ACCURACY = 0.98 # accuracy the first engine needs on the strokes it keeps
+
+
+class Cascade:
+    def __init__(self, first, second, threshold=0.0) -> None:
+        self.first = first
+        self.second = second
+        self.threshold = threshold
+
+    def classify(self, points) -> tuple[str, float, bool]:
+        """(label, score, escalated)"""
+        label, score = self.first.classify(points)
+        if score >= self.threshold:
+            return label, score, False
+        label, score = self.second.classify(points)
+        return label, score, True
+
+    def calibrate(self, samples:list, target=TARGET_ACCURACY) -> float:
+        """Lowest threshold where the first engine's accepted answers are at least target accurate"""
+        results = [(self.first.classify(points), label) for label, points in samples]
+        scores = np.array([score for (_, score), _ in results])
+        correct = np.array([result == label for (result, _), label in results])
+
+        # accuracy of everything above each score, from the highest score downwards
+        order = np.argsort(-scores)
+        accuracy = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+        ok = np.nonzero(accuracy >= target)[0]
+        if len(ok) == 0:
+            self.threshold = np.inf # never trust the first engine
+        else:
+            self.threshold = scores[order][ok[-1]]
+        return self.threshold
+
+    def evaluate(self, samples:list) -> dict:
+        latencies = []
+        correct = 0
+        escalated = 0
+        for label, points in samples:
+            start = time.perf_counter()
+            result, _, up = self.classify(points)
+            latencies.append((time.perf_counter() - start) * 1000)
+            correct += result == label
+            escalated += up
+        return summarize(latencies, correct, escalated, len(samples))
+
+
+def summarize(latencies:list, correct:int, escalated:int, n:int) -> dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"accuracy": correct / n, "escalated": escalated / n,
+            "mean ms": float(np.mean(latencies)), "p50 ms": p50, "p95 ms": p95, "p99 ms": p99}
+
+def evaluate_engine(engine, samples:list) -> dict:
+    """A single engine, for comparison"""
+    latencies = []
+    correct = 0
+    for label, points in samples:
+        start = time.perf_counter()
+        result, _ = engine.classify(points)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += result == label
+    return summarize(latencies, correct, 0, len(samples))
+
+def split_templates(samples:list, per_class=1):
+    """First per_class recordings of every label as $1 templates (like load_templates), and the rest.
+    A template matches itself with a score of ~1, so it can't be calibrated or tested on"""
+    counts = {}
+    templates = []
+    rest = []
+    for label, points in samples:
+        counts[label] = counts.get(label, 0) + 1
+        if counts[label] <= per_class:
+            templates.append(Parser.resample_path(label, points))
+        else:
+            rest.append((label, points))
+    return templates, rest
+
+def print_stats(name:str, stats:dict):
+    print(f"{name:<12} acc={stats['accuracy']:.3f} escalated={stats['escalated']:.3f} "
+          f"mean={stats['mean ms']:.2f}ms p50={stats['p50 ms']:.2f}ms "
+          f"p95={stats['p95 ms']:.2f}ms p99={stats['p99 ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the $1 -> LSTM cascade on recorded gestures")
+    parser.add_argument("--templates", default=TEST_OWN_PATH, help="$1 templates (.xml or .csv folder)")
+    parser.add_argument("--samples", default=TEST_OWN_PATH)
+    parser.add_argument("--target", type=float, default=TARGET_ACCURACY)
+    parser.add_argument("--lstm-first", action="store_true", help="run the LSTM first instead of $1")
+    args = parser.parse_args()
+
+    samples = Parser.read_csv_files(args.samples)
+    if os.path.samefile(args.templates, args.samples) and len(Parser.read_xml_files(args.templates)) == 0:
+        # templates from the recordings: keep them out of the calibration + test samples
+        templates, samples = split_templates(samples)
+    else:
+        templates = load_templates(args.templates)
+    dollar = DollarEngine(templates)
+    lstm = LstmEngine()
+    first, second = (lstm, dollar) if args.lstm_first else (dollar, lstm)
+
+    # calibrate on one half, report on the other
+    calib = samples[0::2]
+    test = samples[1::2]
+
+    cascade = Cascade(first, second)
+    threshold = cascade.calibrate(calib, args.target)
+    print(f"threshold ({first.name}): {threshold:.3f}")
+
+    print_stats(first.name, evaluate_engine(first, test))
+    print_stats(second.name, evaluate_engine(second, test))
+    print_stats("cascade", cascade.evaluate(test))
@@ -0,0 +1,70 @@
+# the two recognizers behind one interface: classify(raw points) -> (label, score)
+import os
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from scipy.signal import resample
+from recognizer import Parser, Recognizer
+
+MODEL_PATH = "gesture-recognizer.keras"
+TEST_OWN_PATH = "dataset/test-own"
+LSTM_POINTS = 50 # NUM_POINTS of the notebook
+
+# LabelEncoder order of the training labels (= sorted), named like in dataset/test-own
+LSTM_LABELS = ["arrow", "caret", "check", "circle", "delete_mark", "left_curly_brace",
+               "left_sq_brace", "pigtail", "question_mark", "rectangle", "right_curly_brace",
+               "right_sq_brace", "star", "triangle", "v", "x"]
+
+
+def load_templates(folderpath:str, per_class=1) -> list:
+    """Templates in the Parser format ([(label, points)] per gesture).
+    .xml gestures are all used, recorded .csv gestures only the first per_class of each label (None = all)"""
+    templates = Parser.parse_xml_files(folderpath)
+    if len(templates) > 0:
+        return templates
+
+    counts = {}
+    for label, points in Parser.read_csv_files(folderpath):
+        counts[label] = counts.get(label, 0) + 1
+        if per_class is None or counts[label] <= per_class:
+            templates.append(Parser.resample_path(label, points))
+    return templates
+
+
+class DollarEngine:
+    """$1 recognizer with the templates preprocessed once"""
+    name = "$1"
+
+    def __init__(self, templates:list, recognizer=None) -> None:
+        self.recognizer = Recognizer() if recognizer is None else recognizer
+        self.templates = self.recognizer.preprocess_templates(templates)
+        self.labels = sorted(set(label for label, _ in self.templates))
+
+    def classify(self, points) -> tuple[str, float]:
+        _, resampled = Parser.resample_path("none", np.asarray(points, dtype=float))[0]
+        return self.recognizer.match(resampled, self.templates)
+
+
+class LstmEngine:
+    """The keras model from unistroke-gestures.ipynb, score = softmax probability"""
+    name = "lstm"
+
+    def __init__(self, model_path=MODEL_PATH, labels=LSTM_LABELS) -> None:
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+        import keras
+        self.model = keras.models.load_model(model_path, compile=False)
+        self.labels = labels
+        self.scaler = StandardScaler()
+
+    def resample(self, points):
+        points = self.scaler.fit_transform(np.asarray(points, dtype=float))
+        return resample(points, LSTM_POINTS)
+
+    def predict(self, points) -> tuple[int, float]:
+        """Class index + probability. Calls the model directly, predict() has a lot of overhead per call"""
+        probs = np.asarray(self.model(np.array([self.resample(points)]), training=False))[0]
+        prediction = int(np.argmax(probs))
+        return prediction, float(probs[prediction])
+
+    def classify(self, points) -> tuple[str, float]:
+        prediction, score = self.predict(points)
+        return self.labels[prediction], score
@@ -0,0 +1,150 @@
+# cross validation for the $1 recognizer
+# the pairwise gesture distances are computed once (in parallel), cached on disk,
+# and leave-one-out, k-fold and learning curves are answered from the matrix
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from recognizer import Parser, Recognizer, NUM_POINTS
+from engines import TEST_OWN_PATH
+
+CACHE_DIR = ".cache"
+CHUNK_ROWS = 16 # rows of the matrix per task
+BACKEND = "auto"
+
+# ----- DATA ----- #
+
+def load_gestures(folderpath:str, recognizer:Recognizer):
+    """Labels + preprocessed points (M, NUM_POINTS, 2) of every .csv/.xml gesture in a folder"""
+    raw = Parser.read_csv_files(folderpath) + Parser.read_xml_files(folderpath)
+    labels = np.array([label for label, _ in raw])
+    points = np.array([recognizer.preprocess(Parser.resample_path(label, p)[0][1]) for label, p in raw])
+    return labels, points
+
+def cache_key(labels, points, recognizer:Recognizer) -> str:
+    h = hashlib.sha1()
+    h.update("\n".join(labels).encode())
+    h.update(np.ascontiguousarray(points).tobytes())
+    h.update(f"{NUM_POINTS} {recognizer.angle_range} {recognizer.angle_precision}".encode())
+    return h.hexdigest()[:16]
+
+# ----- DISTANCE MATRIX ----- #
+
+_points = None
+_recognizer = None
+
+def init_worker(points, backend):
+    global _points, _recognizer
+    _points = points
+    _recognizer = Recognizer(backend=backend)
+
+def distance_rows(rows:range):
+    """D[i, j] = distance of gesture i to template j at the best angle (like in Recognizer.match)"""
+    rec = _recognizer
+    out = np.empty((len(rows), len(_points)))
+    for r, i in enumerate(rows):
+        for j in range(len(_points)):
+            out[r, j] = rec.distance_at_best_angle(_points[i], _points[j], -rec.angle_range,
+                                                   +rec.angle_range, rec.angle_precision)
+    return rows, out
+
+def distance_matrix(points, workers=None, backend=BACKEND):
+    m = len(points)
+    matrix = np.empty((m, m))
+    chunks = [range(i, min(i + CHUNK_ROWS, m)) for i in range(0, m, CHUNK_ROWS)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(points, backend)) as pool:
+        for rows, out in pool.map(distance_rows, chunks):
+            matrix[rows.start:rows.stop] = out
+    return matrix
+
+def load_or_compute(folderpath=TEST_OWN_PATH, workers=None, backend=BACKEND, cache_dir=CACHE_DIR):
+    """(labels, distance matrix), from the cache if the gestures didn't change"""
+    recognizer = Recognizer(backend=backend)
+    labels, points = load_gestures(folderpath, recognizer)
+    path = f"{cache_dir}/distances-{cache_key(labels, points, recognizer)}.npz"
+
+    if os.path.exists(path):
+        cached = np.load(path)
+        return cached["labels"], cached["matrix"]
+
+    start = time.perf_counter()
+    matrix = distance_matrix(points, workers, backend)
+    print(f"distance matrix {matrix.shape}: {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path, labels=labels, matrix=matrix)
+    return labels, matrix
+
+# ----- EXPERIMENTS ----- #
+
+def predict(labels, matrix, test, templates):
+    """Nearest template label for every test gesture"""
+    sub = matrix[np.ix_(test, templates)]
+    return labels[templates][np.argmin(sub, axis=1)]
+
+def leave_one_out(labels, matrix) -> float:
+    d = matrix.copy()
+    np.fill_diagonal(d, np.inf)
+    predictions = labels[np.argmin(d, axis=1)]
+    return np.mean(predictions == labels)
+
+def stratified_folds(labels, k:int, rng):
+    """Fold id per gesture, every label spread evenly over the folds"""
+    folds = np.empty(len(labels), dtype=int)
+    for label in np.unique(labels):
+        idx = np.nonzero(labels == label)[0]
+        rng.shuffle(idx)
+        folds[idx] = np.arange(len(idx)) % k
+    return folds
+
+def k_fold(labels, matrix, k=5, seed=0) -> list:
+    folds = stratified_folds(labels, k, np.random.default_rng(seed))
+    accuracies = []
+    for fold in range(k):
+        test = np.nonzero(folds == fold)[0]
+        templates = np.nonzero(folds != fold)[0]
+        accuracies.append(np.mean(predict(labels, matrix, test, templates) == labels[test]))
+    return accuracies
+
+def learning_curve(labels, matrix, max_per_class=None, repeats=20, seed=0) -> dict:
+    """Accuracy (mean, std) for n random templates per label, tested on all other gestures"""
+    rng = np.random.default_rng(seed)
+    per_label = {label: np.nonzero(labels == label)[0] for label in np.unique(labels)}
+    smallest = min(len(idx) for idx in per_label.values())
+    if max_per_class is None:
+        max_per_class = smallest - 1 # at least one test gesture per label
+    max_per_class = min(max_per_class, smallest - 1)
+
+    curve = {}
+    for n in range(1, max_per_class + 1):
+        accuracies = []
+        for _ in range(repeats):
+            templates = np.concatenate([rng.choice(idx, n, replace=False) for idx in per_label.values()])
+            test = np.setdiff1d(np.arange(len(labels)), templates)
+            accuracies.append(np.mean(predict(labels, matrix, test, templates) == labels[test]))
+        curve[n] = (np.mean(accuracies), np.std(accuracies))
+    return curve
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross validation of the $1 recognizer")
+    parser.add_argument("--data", default=TEST_OWN_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", default=BACKEND)
+    args = parser.parse_args()
+
+    labels, matrix = load_or_compute(args.data, args.workers, args.backend)
+
+    start = time.perf_counter()
+    print(f"leave-one-out: {leave_one_out(labels, matrix):.3f}")
+    accuracies = k_fold(labels, matrix, args.folds)
+    print(f"{args.folds}-fold: {np.mean(accuracies):.3f} +- {np.std(accuracies):.3f}")
+    print("templates per class:")
+    for n, (mean, std) in learning_curve(labels, matrix, repeats=args.repeats).items():
+        print(f"\t{n}: {mean:.3f} +- {std:.3f}")
+    print(f"experiments: {(time.perf_counter() - start) * 1000:.1f}ms")
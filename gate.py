@@ -0,0 +1,147 @@
+# early reject gate for unknown gestures
+# cheap stroke descriptors + per class envelopes, runs before the $1 recognizer / the model
+import math
+import numpy as np
+from recognizer import Parser
+
+TEST_OWN_PATH = "dataset/test-own"
+GATE_POINTS = 32 # equidistant points for the turning angles
+HIST_BINS = 6 # turning angle histogram over [0, pi]
+MIN_POINTS = 5
+MIN_SIZE = 10 # px, smaller strokes are clicks
+MARGIN = 0.25 # widen the calibrated ranges by this part of their spread
+
+# minimal half width of an envelope per scalar feature (for classes with few samples)
+FEATURE_FLOORS = np.array([0.3, 0.1, 0.3])
+HIST_FLOOR = 0.2
+
+def resample_equidistant(points, n=GATE_POINTS):
+    """Resample along the arc length (scipy's resample assumes a periodic signal and pulls the ends together)"""
+    points = np.asarray(points, dtype=float)
+    seg = np.hypot(*np.diff(points, axis=0).T)
+    dist = np.concatenate([[0], np.cumsum(seg)])
+    if dist[-1] == 0:
+        return np.repeat(points[:1], n, axis=0)
+    steps = np.linspace(0, dist[-1], n)
+    x = np.interp(steps, dist, points[:, 0])
+    y = np.interp(steps, dist, points[:, 1])
+    return np.stack([x, y], axis=1)
+
+def describe(points):
+    """Stroke descriptors: ([path length, closedness, aspect], turning angle histogram)
+    everything relative to the bbox diagonal, so it doesn't depend on the drawing size"""
+    points = np.asarray(points, dtype=float)
+    min_xy = np.min(points, 0)
+    max_xy = np.max(points, 0)
+    width, height = max_xy - min_xy
+    diagonal = max(math.hypot(width, height), 1e-9)
+
+    length = np.sum(np.hypot(*np.diff(points, axis=0).T)) / diagonal
+    closedness = math.hypot(*(points[-1] - points[0])) / diagonal
+    eps = 0.05 * diagonal # lines would have a ratio of ~inf otherwise
+    aspect = math.log((width + eps) / (height + eps))
+
+    resampled = resample_equidistant(points)
+    angles = np.arctan2(*np.diff(resampled, axis=0).T[::-1])
+    turns = np.abs((np.diff(angles) + np.pi) % (2 * np.pi) - np.pi)
+    hist, _ = np.histogram(turns, bins=HIST_BINS, range=(0, np.pi))
+    hist = hist / max(len(turns), 1)
+
+    return np.array([length, closedness, aspect]), hist
+
+
+class RejectGate:
+    """Rejects strokes that fit the envelope of no known class"""
+
+    def __init__(self) -> None:
+        self.envelopes = {} # label -> (low, high, mean hist, max hist distance)
+
+    def calibrate(self, samples:list):
+        """samples: [(label, raw points), ...]"""
+        per_class = {}
+        for label, points in samples:
+            if len(points) < 2:
+                continue
+            per_class.setdefault(label, []).append(describe(points))
+
+        self.envelopes = {}
+        for label, descriptors in per_class.items():
+            features = np.array([d[0] for d in descriptors])
+            hists = np.array([d[1] for d in descriptors])
+
+            low = np.min(features, 0)
+            high = np.max(features, 0)
+            pad = np.maximum(MARGIN * (high - low), FEATURE_FLOORS)
+            mean_hist = np.mean(hists, 0)
+            hist_dist = np.max(np.sum(np.abs(hists - mean_hist), 1))
+
+            self.envelopes[label] = (low - pad, high + pad, mean_hist,
+                                     hist_dist * (1 + MARGIN) + HIST_FLOOR)
+        return self
+
+    @staticmethod
+    def calibrate_on(folderpath=TEST_OWN_PATH, labels=None):
+        """Gate calibrated on recorded gestures, optionally only for some labels"""
+        samples = Parser.read_csv_files(folderpath)
+        if labels is not None:
+            samples = [s for s in samples if s[0] in labels]
+        return RejectGate().calibrate(samples)
+
+    def candidates(self, points) -> list:
+        """Labels whose envelope contains the stroke"""
+        if len(points) < MIN_POINTS:
+            return []
+        points = np.asarray(points, dtype=float)
+        if np.max(np.ptp(points, 0)) < MIN_SIZE:
+            return []
+
+        features, hist = describe(points)
+        labels = []
+        for label, (low, high, mean_hist, max_dist) in self.envelopes.items():
+            if np.any(features < low) or np.any(features > high):
+                continue
+            if np.sum(np.abs(hist - mean_hist)) > max_dist:
+                continue
+            labels.append(label)
+        return labels
+
+    def accepts(self, points) -> bool:
+        return len(self.candidates(points)) > 0
+
+
+def random_scribble(rng, n=60):
+    """Jittery random walk as a stand in for invalid input"""
+    steps = rng.normal(0, 15, size=(n, 2))
+    return np.cumsum(steps, axis=0) + 350
+
+def evaluate_gate(folderpath=TEST_OWN_PATH, folds=2, scribbles=200, seed=0):
+    """False reject rate on the recorded gestures (k-fold, calibrated without the tested samples)
+    and the reject rate on random scribbles"""
+    samples = Parser.read_csv_files(folderpath)
+    rng = np.random.default_rng(seed)
+    fold_ids = np.arange(len(samples)) % folds
+    rng.shuffle(fold_ids)
+
+    rejected = 0
+    per_class = {}
+    for k in range(folds):
+        train = [s for s, f in zip(samples, fold_ids) if f != k]
+        test = [s for s, f in zip(samples, fold_ids) if f == k]
+        gate = RejectGate().calibrate(train)
+        for label, points in test:
+            if not gate.accepts(points):
+                rejected += 1
+                per_class[label] = per_class.get(label, 0) + 1
+
+    gate = RejectGate().calibrate(samples)
+    noise_rejected = sum(not gate.accepts(random_scribble(rng)) for _ in range(scribbles))
+
+    print(f"false reject rate: {rejected / len(samples):.3f} ({rejected}/{len(samples)})")
+    for label, count in sorted(per_class.items()):
+        print(f"\t{label}: {count}")
+    print(f"scribble reject rate: {noise_rejected / scribbles:.3f}")
+    return rejected / len(samples), noise_rejected / scribbles
+
+
+if __name__ == "__main__":
+    evaluate_gate()
@@ -1,12 +1,10 @@
-from pysinewave import SineWave
 from recognizer import Parser
 from templates import Templates
+from tone_engine import ToneEngine
+from pipeline import application_pipeline
 import pyglet
-from time import sleep
-import keras
-import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from scipy.signal import resample
 import os
 # application for task 3
@@ -38,21 +36,23 @@ VOLUME = -5
 
 class Path:
     def __init__(self) -> None:
-        self.path = []
         self.circles = []
         self.line = []
         self.batch = pyglet.graphics.Batch()
-        self.scaler = StandardScaler()
         self.load()
     
     def load(self):
-        self.model = keras.models.load_model(MODEL_PATH, compile=False)
+        # capture -> gate -> model (see: pipeline.py)
+        self.pipeline = application_pipeline(MODEL_PATH)
 
-    def add_point(self, x, y):
-        p = [x, y]
+    @property
+    def path(self):
+        """Kept points of the current stroke (see: capture.py)"""
+        return self.pipeline.points
 
-        self.path.append(p)        
-        self.create_path_line(p)
+    def add_point(self, x, y):
+        for p in self.pipeline.drag(x, y):
+            self.create_path_line(p)
 
     def create_path_line(self, point):
         """Create a line following the mouse path for visual drawing feedback"""
@@ -76,18 +76,22 @@ class Path:
     
     def recognize_gesture(self):
         """Use the $1 recognizer on the path"""
-        print(f"Recognizing the gesture...\t -> {len(self.path)}")
-
-        # parse path into right data shape
-        points = np.array(self.path)
+        for p in self.pipeline.finish():
+            self.create_path_line(p)
+        print(f"Recognizing the gesture...\t -> {len(self.path)} of {self.pipeline.capture.raw_count} points")
+
+        result = self.pipeline.predict()
+        # the gate skips the model for obviously unknown strokes
+        if result is None:
+            Tone.oops()
+            area.info.text = "oops... don't know this one"
+            return
 
-        points = self.scaler.fit_transform(points)
-        test = resample(points, NUM_POINTS)
-        print(test.shape)
+        prediction, score = result
+        print("pred", prediction, self.pipeline.engine.labels[prediction], score)
 
-        predictions = self.model.predict(np.array([test]))
-        prediction = np.argmax(predictions)
-        print("pred", prediction)
+        # resampled path for the song display
+        test = self.pipeline.engine.resample(self.path)
 
         correct_gesture = Tone.play_tone(prediction)
         if correct_gesture:
@@ -98,7 +102,7 @@ class Path:
 
 
     def reset(self):
-        self.path = []
+        self.pipeline.press()
         self.circles = []
         self.line = []
 
@@ -145,11 +149,10 @@ class SongDisplay:
         self.notes.append(prediction)
 
     def play_full(self):
-        for note in self.notes:
-            Tone.play_tone(note)
+        Tone.play_song(self.notes)
 
     def reset(self):
-        Tone.waves = []
+        Tone.reset()
         song.notes = []
         song.lines = []
 
@@ -233,97 +236,37 @@ class Menu:
 
 
 class Tone:
-    """Creates sine waves that emulate the gesture. Uses: https://pypi.org/project/pysinewave/"""
-    waves =  []
+    """Plays the pre-rendered gesture tones (see: tone_engine.py),
+    envelopes emulate the gesture like the former https://pypi.org/project/pysinewave/ waves"""
+    engine = ToneEngine(volume=VOLUME)
+    # prediction -> envelope
+    tones = {1: "v", 4: "pigtail", 8: "circle", 12: "star"}
 
     def test_wave():
-        sineWave = SineWave(pitch=12, pitch_per_second=10) 
-        sineWave.set_volume(-1)
-        sineWave.play()
-        sleep(2)
-        sineWave.set_pitch(-5)
-        sleep(3)
-        sineWave.stop()
+        Tone.engine.play("test")
 
     def play_tone(prediction:int)-> bool:
-        match(prediction):
-            case 1: 
-                Tone.v_wave()
-            case 4:
-                Tone.pig_wave()
-            case 8: 
-                Tone.circle_wave()
-            case 12:
-                Tone.star_wave()
-            case _:
-                print("oops")
-                Tone.oops_wave()
-                return False
+        if prediction not in Tone.tones:
+            print("oops")
+            Tone.oops()
+            return False
+        Tone.engine.play(Tone.tones[prediction])
         return True
 
-    def v_wave():
-        wave = SineWave(pitch=12, pitch_per_second=60)
-        wave.set_volume(VOLUME)
-        wave.play()
-        sleep(1)
-        wave.set_pitch(0)
-        sleep(1)
-        wave.set_pitch(12)
-        sleep(2)
-        wave.stop()
-
-    def pig_wave():
-        wave = SineWave(pitch=-4, pitch_per_second=120)
-        wave.set_volume(VOLUME)
-        wave.play()
-        sleep(1)
-        wave.set_pitch(8)
-        sleep(1)
-        wave.set_pitch(-2)
-        sleep(2)
-        wave.stop()
-
-    def circle_wave():
-        wave = SineWave(pitch=6, pitch_per_second=10)
-        wave.set_volume(VOLUME)
-        wave.play()
-        sleep(1)
-        wave.set_pitch(-6)
-        sleep(1)
-        wave.set_pitch(6)
-        sleep(2)
-        wave.stop()
-
-    def star_wave():
-        p = 6
-        wave = SineWave(pitch=-p, pitch_per_second=20)
-        wave.set_volume(VOLUME)
-        wave.play()
-        sleep(1)
-        wave.set_pitch(p * 2) # top mid
-        sleep(1)
-        wave.set_pitch(-p) # bot r
-        sleep(1)
-        wave.set_pitch(p -2 ) # l
-        sleep(1)
-        wave.set_pitch(p) # r
-        sleep(1)
-        wave.set_pitch(-p - 2) # bot r
-        sleep(2)
-        wave.stop()
-
-    def oops_wave():
-        wave = SineWave(pitch=4, pitch_per_second=150)
-        wave.set_volume(VOLUME)
-        wave.play()
-        sleep(0.5)
-        wave.set_pitch(-2)
-        sleep(1)
-        wave.stop()
+    def oops():
+        Tone.engine.play("oops")
+
+    def play_song(notes:list):
+        """Queue all notes as one buffer"""
+        Tone.engine.enqueue([Tone.tones[note] for note in notes])
+
+    def reset():
+        Tone.engine.clear()
 
 
 # ----- INIT ----- #
 
+Tone.engine.prerender()
 path = Path()
 menu = Menu()
 area = Area()
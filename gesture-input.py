@@ -1,9 +1,13 @@
-from recognizer import Parser, Recognizer
+from recognizer import Parser
 from templates import Templates
+from pipeline import input_pipeline
+from registry import TemplateRegistry
 import pyglet
 import pandas as pd
 import numpy as np
+import sys
 # gesture input program for first task
+# optional: python gesture-input.py <user> to use the templates in dataset/users/<user>
 
 MENU_WIDTH = 200
 WIDTH = 700 + MENU_WIDTH
@@ -14,6 +18,7 @@ RADIUS = 2
 COLOR = (196, 183, 203)
 
 TEMPLATE_PATH = "dataset/templates"
+USER = sys.argv[1] if len(sys.argv) > 1 else None
 MENU_BG = (206, 196, 212) # (216, 208, 221) # (196, 183, 203) # little darker
 SEP_COL = (94, 86, 90)
 Y_OFFSET = 15
@@ -22,11 +27,9 @@ Y_OFFSET = 15
 
 class Path:
     def __init__(self) -> None:
-        self.path = []
         self.circles = []
         self.line = []
         self.batch = pyglet.graphics.Batch()
-        self.reco = Recognizer()
 
         self.t = Templates()
         # print(self.t.gestures)
@@ -35,14 +38,25 @@ class Path:
         # self.templates = Parser.resample_path("star", self.t.star)
 
         # self.templates = Parser.parse_xml_files(TEMPLATE_PATH)
+
+        # capture -> gate -> $1 (see: pipeline.py)
+        self.pipeline = input_pipeline(self.t.gestures)
+        if USER is not None:
+            try:
+                self.pipeline.set_user(TemplateRegistry(), USER)
+            except KeyError as e:
+                sys.exit(f"{e.args[0]}, users: {TemplateRegistry().users()}")
         self.i = 1
         self.name = "x"
-    
-    def add_point(self, x, y):
-        p = [x, y]
 
-        self.path.append(p)        
-        self.create_path_line(p)
+    @property
+    def path(self):
+        """Kept points of the current stroke (see: capture.py)"""
+        return self.pipeline.points
+
+    def add_point(self, x, y):
+        for p in self.pipeline.drag(x, y):
+            self.create_path_line(p)
 
     def create_path_line(self, point):
         """Create a line following the mouse path for visual drawing feedback"""
@@ -68,8 +82,9 @@ class Path:
     def recognize_gesture(self):
         """Use the $1 recognizer on the path"""
 
-        print(f"Recognizing the gesture...\t -> {len(self.path)}")
-        _, points = Parser.resample_path("none", self.path)[0]
+        for p in self.pipeline.finish():
+            self.create_path_line(p)
+        print(f"Recognizing the gesture...\t -> {len(self.path)} of {self.pipeline.capture.raw_count} points")
 
         # df = pd.DataFrame(np.array(self.path), columns=["x", "y"])
         # # print(df.head())
@@ -79,11 +94,17 @@ class Path:
         # print(self.i)
         # self.i += 1
 
-        result, score = self.reco.recognize(points, self.templates)
+        result = self.pipeline.recognize()
+        # the gate doesn't run the recognizer on scribbles
+        if result is None:
+            area.set_gesture_label("no_match")
+            return
+
+        result, score = result
         area.set_gesture_label(f"{result}, {score} ")
 
     def reset(self):
-        self.path = []
+        self.pipeline.press()
         self.circles = []
         self.line = []
         area.set_gesture_label("...")
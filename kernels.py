@@ -0,0 +1,310 @@
+# compiled distance kernels for the $1 recognizer (STEP 4)
+# rotation + path distance fused into one pass, numba if installed, numpy otherwise
+import time
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+BACKENDS = ["python", "numpy", "numba"]
+
+
+# ----- NUMPY ----- #
+
+def np_distance_at_best_angle(points, T, a, b, threshold, phi):
+    """Golden section search like Recognizer.distance_at_best_angle.
+    Rotating around the centroid doesn't move it, so it is computed only once"""
+    points = np.asarray(points, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    cx, cy = np.mean(points, 0)
+    px = points[:, 0] - cx
+    py = points[:, 1] - cy
+    tx = T[:, 0] - cx
+    ty = T[:, 1] - cy
+    ex = np.empty_like(px)
+    ey = np.empty_like(py)
+    tmp = np.empty_like(px)
+
+    def distance_at_angle(radians):
+        cos = np.cos(radians)
+        sin = np.sin(radians)
+        # ex = px * cos - py * sin - tx, without new arrays
+        np.multiply(px, cos, out=ex)
+        np.multiply(py, sin, out=tmp)
+        np.subtract(ex, tmp, out=ex)
+        np.subtract(ex, tx, out=ex)
+        np.multiply(px, sin, out=ey)
+        np.multiply(py, cos, out=tmp)
+        np.add(ey, tmp, out=ey)
+        np.subtract(ey, ty, out=ey)
+        np.hypot(ex, ey, out=tmp)
+        return tmp.mean()
+
+    x1 = phi * a + (1.0 - phi) * b
+    f1 = distance_at_angle(x1)
+    x2 = (1.0 - phi) * a + phi * b
+    f2 = distance_at_angle(x2)
+
+    while abs(b - a) > threshold:
+        if f1 < f2:
+            b = x2
+            x2 = x1
+            f2 = f1
+            x1 = phi * a + (1.0 - phi) * b
+            f1 = distance_at_angle(x1)
+        else:
+            a = x1
+            x1 = x2
+            f1 = f2
+            x2 = (1.0 - phi) * a + phi * b
+            f2 = distance_at_angle(x2)
+    return min(f1, f2)
+
+def np_batch_distance_at_best_angle(points, T, a, b, threshold, phi):
+    """np_distance_at_best_angle for many (points, T) pairs at once: (P, N, 2) each -> (P,).
+    Every pair gets its own search interval, they are all moved one golden section step per iteration"""
+    points = np.asarray(points, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    centroid = points.mean(axis=1, keepdims=True)
+    px, py = np.moveaxis(points - centroid, 2, 0)
+    tx, ty = np.moveaxis(T - centroid, 2, 0)
+
+    def distance_at_angle(radians):
+        cos = np.cos(radians)[:, None]
+        sin = np.sin(radians)[:, None]
+        return np.hypot(px * cos - py * sin - tx, px * sin + py * cos - ty).mean(axis=1)
+
+    a = np.full(len(points), float(a))
+    b = np.full(len(points), float(b))
+    x1 = phi * a + (1.0 - phi) * b
+    f1 = distance_at_angle(x1)
+    x2 = (1.0 - phi) * a + phi * b
+    f2 = distance_at_angle(x2)
+
+    active = np.abs(b - a) > threshold
+    while np.any(active):
+        left = active & (f1 < f2) # the minimum is left of x2
+        right = active & ~(f1 < f2)
+        b = np.where(left, x2, b)
+        a = np.where(right, x1, a)
+        x2, x1 = np.where(left, x1, x2), np.where(right, x2, x1)
+        f2, f1 = np.where(left, f1, f2), np.where(right, f2, f1)
+        # new samples: x1 for the left ones, x2 for the right ones
+        x1 = np.where(left, phi * a + (1.0 - phi) * b, x1)
+        x2 = np.where(right, (1.0 - phi) * a + phi * b, x2)
+        f = distance_at_angle(np.where(left, x1, x2))
+        f1 = np.where(left, f, f1)
+        f2 = np.where(right, f, f2)
+        active = np.abs(b - a) > threshold
+    return np.minimum(f1, f2)
+
+def np_batch_distance_at_closed_angle(points, T, a, b):
+    """Distance at the angle that minimizes the squared point distances (closed form, like Protractor),
+    clipped to [a, b], for many (points, T) pairs: (P, N, 2) each -> (P,).
+    No search: one distance per pair instead of ~10 for the golden section search"""
+    points = np.asarray(points, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    centroid = points.mean(axis=1, keepdims=True)
+    px, py = np.moveaxis(points - centroid, 2, 0)
+    tx, ty = np.moveaxis(T - centroid, 2, 0)
+
+    radians = np.clip(np.arctan2(np.sum(px * ty - py * tx, 1), np.sum(px * tx + py * ty, 1)), a, b)
+    cos = np.cos(radians)[:, None]
+    sin = np.sin(radians)[:, None]
+    return np.hypot(px * cos - py * sin - tx, px * sin + py * cos - ty).mean(axis=1)
+
+
+# ----- NUMBA ----- #
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=False)
+    def _nb_distance_at_angle(points, T, cx, cy, radians):
+        cos = np.cos(radians)
+        sin = np.sin(radians)
+        d = 0.0
+        for i in range(points.shape[0]):
+            dx = points[i, 0] - cx
+            dy = points[i, 1] - cy
+            ex = T[i, 0] - (dx * cos - dy * sin + cx)
+            ey = T[i, 1] - (dx * sin + dy * cos + cy)
+            d += np.sqrt(ex * ex + ey * ey)
+        return d / points.shape[0]
+
+    @njit(cache=True, fastmath=False)
+    def _nb_distance_at_best_angle(points, T, a, b, threshold, phi):
+        n = points.shape[0]
+        cx = 0.0
+        cy = 0.0
+        for i in range(n):
+            cx += points[i, 0]
+            cy += points[i, 1]
+        cx /= n
+        cy /= n
+
+        x1 = phi * a + (1.0 - phi) * b
+        f1 = _nb_distance_at_angle(points, T, cx, cy, x1)
+        x2 = (1.0 - phi) * a + phi * b
+        f2 = _nb_distance_at_angle(points, T, cx, cy, x2)
+
+        while abs(b - a) > threshold:
+            if f1 < f2:
+                b = x2
+                x2 = x1
+                f2 = f1
+                x1 = phi * a + (1.0 - phi) * b
+                f1 = _nb_distance_at_angle(points, T, cx, cy, x1)
+            else:
+                a = x1
+                x1 = x2
+                f1 = f2
+                x2 = (1.0 - phi) * a + phi * b
+                f2 = _nb_distance_at_angle(points, T, cx, cy, x2)
+        return min(f1, f2)
+
+    @njit(cache=True, fastmath=False)
+    def _nb_batch_distance_at_best_angle(points, T, a, b, threshold, phi):
+        out = np.empty(points.shape[0])
+        for p in range(points.shape[0]):
+            out[p] = _nb_distance_at_best_angle(points[p], T[p], a, b, threshold, phi)
+        return out
+
+    @njit(cache=True, fastmath=False)
+    def _nb_batch_distance_at_closed_angle(points, T, a, b):
+        out = np.empty(points.shape[0])
+        n = points.shape[1]
+        for p in range(points.shape[0]):
+            cx = 0.0
+            cy = 0.0
+            for i in range(n):
+                cx += points[p, i, 0]
+                cy += points[p, i, 1]
+            cx /= n
+            cy /= n
+            cross = 0.0
+            dot = 0.0
+            for i in range(n):
+                dx = points[p, i, 0] - cx
+                dy = points[p, i, 1] - cy
+                ex = T[p, i, 0] - cx
+                ey = T[p, i, 1] - cy
+                cross += dx * ey - dy * ex
+                dot += dx * ex + dy * ey
+            radians = min(max(np.arctan2(cross, dot), a), b)
+            out[p] = _nb_distance_at_angle(points[p], T[p], cx, cy, radians)
+        return out
+
+    def nb_distance_at_best_angle(points, T, a, b, threshold, phi):
+        return _nb_distance_at_best_angle(np.ascontiguousarray(points, dtype=np.float64),
+                                          np.ascontiguousarray(T, dtype=np.float64),
+                                          float(a), float(b), float(threshold), float(phi))
+
+    def nb_batch_distance_at_best_angle(points, T, a, b, threshold, phi):
+        return _nb_batch_distance_at_best_angle(np.ascontiguousarray(points, dtype=np.float64),
+                                                np.ascontiguousarray(T, dtype=np.float64),
+                                                float(a), float(b), float(threshold), float(phi))
+
+    def nb_batch_distance_at_closed_angle(points, T, a, b):
+        return _nb_batch_distance_at_closed_angle(np.ascontiguousarray(points, dtype=np.float64),
+                                                  np.ascontiguousarray(T, dtype=np.float64),
+                                                  float(a), float(b))
+
+
+def resolve_backend(backend:str) -> str:
+    """"auto" -> numba if it is installed, numpy otherwise"""
+    if backend == "auto" or (backend == "numba" and not HAS_NUMBA):
+        return "numba" if HAS_NUMBA else "numpy"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}, use one of {BACKENDS + ['auto']}")
+    return backend
+
+def get_kernel(backend:str):
+    """distance_at_best_angle(points, T, a, b, threshold, phi) of a backend (None for "python")"""
+    backend = resolve_backend(backend)
+    if backend == "numba":
+        return nb_distance_at_best_angle
+    if backend == "numpy":
+        return np_distance_at_best_angle
+    return None
+
+def get_batch_kernel(backend:str):
+    """batch_distance_at_best_angle(points, T, a, b, threshold, phi) with (P, N, 2) inputs
+    (None for "python")"""
+    backend = resolve_backend(backend)
+    if backend == "numba":
+        return nb_batch_distance_at_best_angle
+    if backend == "numpy":
+        return np_batch_distance_at_best_angle
+    return None
+
+def get_closed_kernel(backend:str):
+    """batch_distance_at_closed_angle(points, T, a, b) with (P, N, 2) inputs (None for "python")"""
+    backend = resolve_backend(backend)
+    if backend == "numba":
+        return nb_batch_distance_at_closed_angle
+    if backend == "numpy":
+        return np_batch_distance_at_closed_angle
+    return None
+
+
+# ----- PARITY ----- #
+
+def check_parity(folderpath="dataset/test-own", tolerance=1e-6):
+    """Compare every backend with the python reference of the Recognizer"""
+    from recognizer import Parser, Recognizer
+    from engines import load_templates
+
+    reference = Recognizer(backend="python")
+    templates = reference.preprocess_templates(load_templates(folderpath))
+    tests = [Parser.resample_path(label, points)[0] for label, points in Parser.read_csv_files(folderpath)]
+
+    start = time.perf_counter()
+    expected = [reference.match(points, templates) for _, points in tests]
+    print(f"python  time={time.perf_counter() - start:.2f}s")
+
+    for backend in ["numpy"] + (["numba"] if HAS_NUMBA else []):
+        rec = Recognizer(backend=backend)
+        rec.match(tests[0][1], templates) # numba compiles here
+
+        start = time.perf_counter()
+        results = [rec.match(points, templates) for _, points in tests]
+        duration = time.perf_counter() - start
+
+        max_diff = max(abs(score - ref_score) for (_, score), (_, ref_score) in zip(results, expected))
+        mismatches = sum(result != ref_result for (result, _), (ref_result, _) in zip(results, expected))
+        print(f"{backend:<7} time={duration:.2f}s max score diff={max_diff:.2e} label mismatches={mismatches}")
+        assert max_diff < tolerance and mismatches == 0, f"{backend} differs from the reference"
+
+        # the batch kernel: every test against every template in one call
+        batch = get_batch_kernel(backend)
+        points = np.array([rec.preprocess(points) for _, points in tests], dtype=np.float64)
+        T = np.array([t for _, t in templates], dtype=np.float64)
+        P = np.repeat(points, len(T), axis=0)
+        batch(P[:1], T[:1], -rec.angle_range, +rec.angle_range, rec.angle_precision, rec.phi)
+        start = time.perf_counter()
+        distances = batch(P, np.tile(T, (len(points), 1, 1)), -rec.angle_range, +rec.angle_range,
+                          rec.angle_precision, rec.phi)
+        duration = time.perf_counter() - start
+        scores = (1.0 - distances / rec.half_diagonal).reshape(len(points), len(T)).max(axis=1)
+        max_diff = max(abs(scores - [ref_score for _, ref_score in expected]))
+        print(f"{backend:<7} batch time={duration:.2f}s max score diff={max_diff:.2e}")
+        assert max_diff < tolerance, f"{backend} batch kernel differs from the reference"
+
+        # the closed form angle is an approximation: score drift, reported but not asserted
+        closed = get_closed_kernel(backend)
+        closed(P[:1], T[:1], -rec.angle_range, +rec.angle_range)
+        start = time.perf_counter()
+        closed_distances = closed(P, np.tile(T, (len(points), 1, 1)), -rec.angle_range, +rec.angle_range)
+        duration = time.perf_counter() - start
+        drift = np.abs(closed_distances - distances) / rec.half_diagonal
+        closed_scores = (1.0 - closed_distances / rec.half_diagonal).reshape(len(points), len(T))
+        closed_labels = np.argmax(closed_scores, axis=1)
+        mismatches = sum(templates[i][0] != label for i, (label, _) in zip(closed_labels, expected))
+        print(f"{backend:<7} closed time={duration:.2f}s score drift mean={drift.mean():.2e} "
+              f"max={drift.max():.2e} label mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    check_parity()
@@ -0,0 +1,72 @@
+# what happens between on_mouse_press and on_mouse_release, without pyglet
+# capture -> early reject gate -> recognizer, shared by the apps and replay.py
+from recognizer import Parser
+from capture import StrokeCapture
+from gate import RejectGate
+from engines import DollarEngine, LstmEngine, MODEL_PATH, TEST_OWN_PATH
+
+
+class GesturePipeline:
+    def __init__(self, engine, gate=None, capture=None) -> None:
+        self.engine = engine
+        self.gate = gate
+        self.capture = StrokeCapture() if capture is None else capture
+        self.registry = None
+        self.user = None
+
+    def set_user(self, registry, user:str):
+        """Recognize with a user's own templates + gate (see: registry.py), None = back to the default ones.
+        Loads the user right away, KeyError if there is no folder for them"""
+        if user is not None:
+            registry.entry(user)
+        self.registry = registry
+        self.user = user
+
+    @property
+    def points(self):
+        return self.capture.points
+
+    def press(self):
+        self.capture.reset()
+
+    def drag(self, x, y, t=None) -> list:
+        """Returns the kept points (for drawing)"""
+        return self.capture.add(x, y, t)
+
+    def finish(self) -> list:
+        """Mouse release, returns the last kept points"""
+        return self.capture.finish()
+
+    def active(self) -> tuple:
+        """(engine, gate) used for the next stroke, the user's own ones if a user is set"""
+        if self.user is None:
+            return self.engine, self.gate
+        return self.registry.entry(self.user)
+
+    def recognize(self):
+        """(label, score), None if the gate rejects the stroke"""
+        engine, gate = self.active()
+        if gate is not None and not gate.accepts(self.points):
+            return None
+        return engine.classify(self.points)
+
+    def predict(self):
+        """(class index, score) for engines with predict() (LstmEngine), None if the gate rejects the stroke"""
+        engine, gate = self.active()
+        if gate is not None and not gate.accepts(self.points):
+            return None
+        return engine.predict(self.points)
+
+
+def input_pipeline(gestures:list) -> GesturePipeline:
+    """gesture-input.py: $1 with the Templates gestures"""
+    templates = Parser.parse_template(gestures)
+    labels = [label for label, _ in gestures]
+    # gate: recorded samples of the template gestures + the templates themselves
+    samples = [s for s in Parser.read_csv_files(TEST_OWN_PATH) if s[0] in labels]
+    gate = RejectGate().calibrate(samples + gestures)
+    return GesturePipeline(DollarEngine(templates), gate)
+
+def application_pipeline(model_path=MODEL_PATH) -> GesturePipeline:
+    """gesture-application.py: the LSTM"""
+    return GesturePipeline(LstmEngine(model_path), RejectGate.calibrate_on(TEST_OWN_PATH))
@@ -2,10 +2,12 @@
 import xml.etree.ElementTree as ET
 import os
 import numpy as np
+import pandas as pd
 import math
 from sklearn.preprocessing import StandardScaler
 from scipy.signal import resample
 from templates import Templates # TODO update to use this instead of TEMPLATE_APTH
+from kernels import get_kernel
 
 TEST_PATH = "dataset/test"
 TEMPLATE_PATH = "dataset/templates"
@@ -24,6 +26,13 @@ class Parser:
     
     def parse_xml_files(folderpath:str):
         data = []
+        for label, points in Parser.read_xml_files(folderpath):
+            data.append(Parser.resample_path(label, points))
+        return data
+
+    def read_xml_files(folderpath:str) -> list:
+        """Raw (label, points) of all .xml gestures, without resampling"""
+        data = []
 
         for root, subdirs, files in os.walk(folderpath):
             # if 'ipynb_checkpoint' in root:
@@ -44,10 +53,26 @@ class Parser:
                             points.append([x, y])
                             
                         points = np.array(points, dtype=float)
-                        data.append(Parser.resample_path(label, points))
+                        data.append((label, points))
         
         return data
 
+    def read_csv_files(folderpath:str) -> list:
+        """Raw (label, points) of the recorded .csv gestures (dataset/test-own)"""
+        data = []
+
+        for root, subdirs, files in os.walk(folderpath):
+            for f in sorted(files):
+                if ".csv" in f:
+                    fname = f.split('.')[0]
+                    label = fname.rsplit('-', 1)[0] # "arrow-10" -> "arrow"
+
+                    points = pd.read_csv(f"{root}/{f}")
+                    points = points[["x", "y"]].to_numpy(dtype=float)
+                    data.append((label, points))
+
+        return data
+
     # STEP 1
     def resample_path(label:str, points:np.array):
         data = []
@@ -72,7 +97,9 @@ class Rect:
 class Recognizer:
     """via: https://depts.washington.edu/acelab/proj/dollar/index.html"""
     
-    def __init__(self) -> None:
+    def __init__(self, backend="auto") -> None:
+        """backend for STEP 4: "python" (reference), "numpy", "numba" or "auto" (see: kernels.py)"""
+        self.kernel = get_kernel(backend)
         self.phi = 0.5 * (-1.0 + math.sqrt(5.0)) # golden ratio
         self.angle_range = self.deg2Rad(45.0)
         self.angle_precision = self.deg2Rad(2.0)
@@ -141,6 +168,9 @@ class Recognizer:
 
     # STEP 4
     def distance_at_best_angle(self, points, T, a, b, threshold):
+        if self.kernel is not None:
+            return self.kernel(points, T, a, b, threshold, self.phi)
+
         x1 = self.phi * a + (1.0 - self.phi) * b
         f1 = self.distance_at_angle(points, T, x1)
         x2 = (1.0 - self.phi) * a + self.phi * b
@@ -189,25 +219,28 @@ class Recognizer:
         for template in templates:
             t_label, t_points = template[0] # template[0] # for unistroke-gestures.ipnby
             t_points = self.preprocess(t_points)
-            ts.append((t_label, t_points))
+            ts.append((t_label, np.array(t_points)))
         return ts
 
     # THE RECOGNIZER
     def recognize(self, points, templates=None) -> tuple[str, float]:
+        if templates == None:
+            templates = self.load_templates()
+        templates = self.preprocess_templates(templates) 
+
+        return self.match(points, templates)
+
+    def match(self, points, templates) -> tuple[str, float]:
+        """recognize() for already preprocessed templates: [(label, points), ...]"""
         b = np.inf
 
-        points = self.preprocess(points) # pre
+        points = np.array(self.preprocess(points)) # pre
 
         result = "no_match"
         score = 0
 
-        if templates == None:
-            templates = self.load_templates()
-        templates = self.preprocess_templates(templates) 
-
         for template in templates:
             t_label, t_points = template # template[0] # for unistroke-gestures.ipnby
-            # t_points = self.preprocess(t_points) # pre # TODO (move out to Parser -> do only once)
             
 
 
@@ -0,0 +1,133 @@
+# per user template sets for the $1 recognizer
+# users are folders with recorded gestures (.csv/.xml), compiled on first use and kept in an LRU cache
+# every user also gets an early reject gate, calibrated on their own gestures
+import os
+import sys
+import time
+from collections import OrderedDict
+from recognizer import Parser
+from engines import DollarEngine
+from gate import RejectGate
+
+USERS_PATH = "dataset/users" # dataset/users/<user>/<label>-<i>.csv
+MAX_ENTRIES = 8
+MAX_BYTES = 16 * 1024 * 1024
+PER_CLASS = None # templates per label and user (None = all recorded ones)
+TEMPLATE_OVERHEAD = 200 # bytes per template on top of the points (tuple, label, array header)
+
+
+def engine_size(engine:DollarEngine) -> int:
+    """Rough memory footprint of a compiled template set"""
+    return sum(points.nbytes + TEMPLATE_OVERHEAD for _, points in engine.templates)
+
+
+def read_samples(folderpath:str) -> list:
+    """Raw (label, points) of every recorded .csv and .xml gesture of a user"""
+    return Parser.read_csv_files(folderpath) + Parser.read_xml_files(folderpath)
+
+def first_per_class(samples:list, per_class=PER_CLASS) -> list:
+    """The first per_class samples of every label (None = all)"""
+    counts = {}
+    kept = []
+    for label, points in samples:
+        counts[label] = counts.get(label, 0) + 1
+        if per_class is None or counts[label] <= per_class:
+            kept.append((label, points))
+    return kept
+
+
+class TemplateRegistry:
+    def __init__(self, folderpath=USERS_PATH, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 per_class=PER_CLASS) -> None:
+        self.folderpath = folderpath
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.per_class = per_class
+        self.cache = OrderedDict() # user -> (fingerprint, engine, gate, size), least recently used first
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def users(self) -> list:
+        if not os.path.isdir(self.folderpath):
+            return []
+        return sorted(d.name for d in os.scandir(self.folderpath) if d.is_dir())
+
+    def fingerprint(self, user:str) -> tuple:
+        """Names, sizes and modification times of a user's gesture files"""
+        folder = f"{self.folderpath}/{user}"
+        if not os.path.isdir(folder):
+            raise KeyError(f"no templates for user {user} in {self.folderpath}")
+        files = []
+        for entry in os.scandir(folder):
+            if entry.name.endswith((".csv", ".xml")):
+                stat = entry.stat()
+                files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(files))
+
+    def get(self, user:str) -> DollarEngine:
+        """Compiled templates of a user, reloaded if the user's files changed"""
+        return self.entry(user)[0]
+
+    def entry(self, user:str) -> tuple:
+        """(engine, gate) of a user, both reloaded together if the user's files changed"""
+        fingerprint = self.fingerprint(user)
+
+        if user in self.cache:
+            cached_fingerprint, engine, gate, _ = self.cache[user]
+            if cached_fingerprint == fingerprint:
+                self.stats["hits"] += 1
+                self.cache.move_to_end(user)
+                return engine, gate
+            self.stats["invalidations"] += 1
+            self.remove(user)
+
+        self.stats["misses"] += 1
+        folder = f"{self.folderpath}/{user}"
+        # same files as the fingerprint: .csv and .xml, the gate also sees the ones beyond per_class
+        samples = read_samples(folder)
+        engine = DollarEngine([Parser.resample_path(label, points)
+                               for label, points in first_per_class(samples, self.per_class)])
+        gate = RejectGate().calibrate(samples)
+        size = engine_size(engine)
+        self.cache[user] = (fingerprint, engine, gate, size)
+        self.size += size
+        self.evict()
+        return engine, gate
+
+    def remove(self, user:str):
+        _, _, _, size = self.cache.pop(user)
+        self.size -= size
+
+    def evict(self):
+        """Drop least recently used users until the limits are kept (the newest one always stays)"""
+        while len(self.cache) > 1 and (len(self.cache) > self.max_entries or self.size > self.max_bytes):
+            user = next(iter(self.cache))
+            self.remove(user)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self.cache.clear()
+        self.size = 0
+
+    def hit_rate(self) -> float:
+        requests = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / requests if requests > 0 else 0.0
+
+
+def simulate(registry:TemplateRegistry, requests=200):
+    """Round robin over the users, prints the time per request and the cache statistics"""
+    users = registry.users()
+    if len(users) == 0:
+        print(f"no users in {registry.folderpath}")
+        return
+    start = time.perf_counter()
+    for i in range(requests):
+        registry.get(users[i % len(users)])
+    duration = time.perf_counter() - start
+    print(f"{requests} requests, {len(users)} users: {duration / requests * 1000:.2f}ms per request")
+    print(f"hit rate: {registry.hit_rate():.3f} {registry.stats}")
+    print(f"cached: {len(registry.cache)} users, {registry.size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    simulate(TemplateRegistry(sys.argv[1] if len(sys.argv) > 1 else USERS_PATH))
@@ -0,0 +1,149 @@
+# headless replay of recorded strokes through the apps' pipelines (see: pipeline.py)
+# reports accuracy and release -> label latency, without opening a window
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+from templates import Templates
+from pipeline import input_pipeline, application_pipeline
+from registry import TemplateRegistry, USERS_PATH
+from engines import TEST_OWN_PATH
+
+DRAG_INTERVAL = 1 / 60 # sec between drag events, for recordings without timestamps
+
+
+def read_strokes(folderpath:str) -> list:
+    """(label, points, timestamps in sec) of every .csv/.xml stroke in a folder.
+    .csv files may have a "t" column, .xml gestures have T in ms"""
+    strokes = []
+    for root, subdirs, files in os.walk(folderpath):
+        for f in sorted(files):
+            fname = f.split('.')[0]
+            if ".csv" in f:
+                label = fname.rsplit('-', 1)[0]
+                df = pd.read_csv(f"{root}/{f}")
+                points = df[["x", "y"]].to_numpy(dtype=float)
+                times = df["t"].to_numpy(dtype=float) if "t" in df.columns else None
+            elif ".xml" in f:
+                label = fname[:-2]
+                xml_root = ET.parse(f'{root}/{f}').getroot()
+                elements = xml_root.findall('Point')
+                points = np.array([[e.get('X'), e.get('Y')] for e in elements], dtype=float)
+                times = None
+                if all(e.get('T') is not None for e in elements):
+                    times = np.array([e.get('T') for e in elements], dtype=float) / 1000
+            else:
+                continue
+
+            if times is None:
+                times = np.arange(len(points)) * DRAG_INTERVAL
+            strokes.append((label, points, times - times[0]))
+    return strokes
+
+def replay_stroke(pipeline, points, times, speed:float):
+    """Press, drag every point (in real time / speed, or at once for speed 0), release.
+    Returns the result + the time from release to label"""
+    pipeline.press()
+    start = time.perf_counter()
+    for (x, y), t in zip(points, times):
+        if speed > 0:
+            wait = start + t / speed - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        # the original timestamps, so the decimation sees the original drawing speed
+        pipeline.drag(x, y, t)
+
+    released = time.perf_counter()
+    pipeline.finish()
+    result = pipeline.recognize()
+    return result, (time.perf_counter() - released) * 1000
+
+def replay(pipeline, strokes:list, speed=0.0) -> dict:
+    labels = set(pipeline.active()[0].labels)
+    latencies = []
+    correct = 0
+    known = 0
+    rejected = 0
+    unknown_rejected = 0
+    raw_points = 0
+    kept_points = 0
+
+    # warm up (numba compiles on the first call), not measured
+    if len(strokes) > 0:
+        replay_stroke(pipeline, strokes[0][1], strokes[0][2], 0)
+
+    for label, points, times in strokes:
+        result, latency = replay_stroke(pipeline, points, times, speed)
+        latencies.append(latency)
+        raw_points += pipeline.capture.raw_count
+        kept_points += len(pipeline.capture)
+
+        if label in labels:
+            known += 1
+            rejected += result is None
+            correct += result is not None and result[0] == label
+        else:
+            # the recognizer can't know it, best case is the gate catching it
+            unknown_rejected += result is None
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"strokes": len(strokes), "known": known,
+            "accuracy": correct / max(known, 1), "false rejects": rejected / max(known, 1),
+            "unknown rejected": unknown_rejected / max(len(strokes) - known, 1),
+            "kept points": kept_points / max(raw_points, 1),
+            "mean ms": float(np.mean(latencies)), "p50 ms": p50, "p95 ms": p95, "p99 ms": p99,
+            "max ms": float(np.max(latencies))}
+
+def check_user(source=TEST_OWN_PATH, labels=("triangle", "rectangle"), per_class=3) -> dict:
+    """Gestures the default templates don't know, recorded by a user:
+    the first per_class recordings become a temporary user folder, all recordings of the labels
+    are replayed through gesture-input's pipeline with that user set. None should be rejected"""
+    strokes = [s for s in read_strokes(source) if s[0] in labels]
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(f"{folder}/user")
+        for label in labels:
+            for i in range(1, per_class + 1):
+                shutil.copy(f"{source}/{label}-{i}.csv", f"{folder}/user")
+        pipeline = input_pipeline(Templates().gestures)
+        pipeline.set_user(TemplateRegistry(folder), "user")
+        stats = replay(pipeline, strokes)
+    assert stats["known"] == len(strokes), stats
+    assert stats["false rejects"] == 0, stats
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded strokes through an app's pipeline")
+    parser.add_argument("--app", choices=["input", "application"], default="input",
+                        help="gesture-input.py ($1) or gesture-application.py (LSTM)")
+    parser.add_argument("--data", default=TEST_OWN_PATH, help="folder with .csv/.xml strokes")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="1 = original speed, 2 = twice as fast, 0 = no waiting")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--user", default=None, help="input app: recognize with a user's templates")
+    parser.add_argument("--users", default=USERS_PATH, help="folder with the user folders")
+    parser.add_argument("--check-user", action="store_true",
+                        help="replay a user's own gestures (triangle, rectangle) and check for rejects")
+    args = parser.parse_args()
+
+    if args.check_user:
+        stats = check_user(args.data)
+    else:
+        if args.app == "input":
+            pipeline = input_pipeline(Templates().gestures)
+            if args.user is not None:
+                try:
+                    pipeline.set_user(TemplateRegistry(args.users), args.user)
+                except KeyError as e:
+                    parser.error(e.args[0])
+        else:
+            pipeline = application_pipeline()
+
+        strokes = read_strokes(args.data) * args.repeat
+        stats = replay(pipeline, strokes, args.speed)
+    for key, value in stats.items():
+        print(f"{key:<18}{value:.3f}" if isinstance(value, float) else f"{key:<18}{value}")
@@ -0,0 +1,372 @@
+# continuous gesture spotting with the $1 recognizer
+# finds gestures in a long point stream (no press/release per gesture) with sliding windows
+import argparse
+import math
+import time
+import numpy as np
+from recognizer import Parser, Recognizer, NUM_POINTS
+from gate import resample_equidistant
+from kernels import get_batch_kernel, get_closed_kernel
+from engines import TEST_OWN_PATH
+
+SPACING = 8.0 # px between the resampled stream points
+# window lengths relative to a template's path length, every template is only compared to these windows
+# (short templates like "v" match parts of everything otherwise)
+SCALES = [0.7, 0.8, 0.9, 1.0, 1.15, 1.3, 1.5]
+HOP = 3 # windows are checked every HOP new resampled points
+THRESHOLD = 0.0 # minimal normalized score for an event
+BACKGROUND_PERCENTILE = 99.9 # of a template's scores on windows that aren't its gesture
+MAX_DELAY = 80 # resampled points after a candidate's end before it is final (partial windows end earlier)
+MAX_DELAY_MS = 750 # or this much time after its end, also if the pen stands still
+EVENT_INTERVAL = 1 / 60 # sec between points added without a timestamp
+# angle per (window, template) pair in closed form instead of the golden section search (see: kernels.py)
+# one distance instead of ~10, the scores of good matches move by < 0.01
+CLOSED_ANGLE = True
+
+
+class GestureSpotter:
+    """Feed points with add(), get (label, start, end, score) events back.
+    start/end are indices of the added raw points"""
+
+    def __init__(self, templates:list, spacing=SPACING, scales=SCALES, hop=HOP, threshold=THRESHOLD,
+                 max_delay=MAX_DELAY, max_delay_ms=MAX_DELAY_MS, closed_angle=CLOSED_ANGLE, backend="auto",
+                 capacity=4096) -> None:
+        """templates: [(label, raw points), ...]"""
+        self.recognizer = Recognizer(backend=backend)
+        self.batch_kernel = get_batch_kernel(backend)
+        self.closed_kernel = get_closed_kernel(backend) if closed_angle else None
+        self.spacing = spacing
+        self.hop = hop
+        self.threshold = threshold
+        self.max_delay = max_delay
+        self.max_delay_ms = max_delay_ms
+
+        # templates resampled like the windows: equidistant, then the $1 preprocessing
+        self.labels = [label for label, _ in templates]
+        self.templates = np.array([self.recognizer.preprocess(resample_equidistant(points, NUM_POINTS))
+                                   for _, points in templates])
+
+        # window length (in resampled points) -> templates to compare it with
+        self.pairs = {}
+        for t, (_, points) in enumerate(templates):
+            length = np.sum(np.hypot(*np.diff(np.asarray(points, dtype=float), axis=0).T))
+            for scale in scales:
+                w = max(int(round(length * scale / spacing)), 2)
+                self.pairs.setdefault(w, []).append(t)
+        self.window_lengths = sorted(self.pairs)
+
+        # $1 score every template gets on windows that aren't its gesture (see: calibrate)
+        # simple templates match parts of other gestures very well, so raw scores aren't comparable
+        self.background = np.zeros(len(self.templates))
+        self.log = None
+
+        # resampled stream: [x, y, raw index, time], grows when full
+        self.stream = np.empty((capacity, 4))
+        # where the NUM_POINTS samples of every window length are, relative to the stream end (fractional indices)
+        self.sample_at = np.array([np.linspace(-w, -1, NUM_POINTS) for w in self.window_lengths])
+        self.reset()
+
+    def reset(self):
+        self.n = 0 # resampled points
+        self.raw_count = 0
+        self.last = None # last raw point
+        self.now = 0.0 # time of the last raw point
+        self.carry = 0.0 # path length since the last resampled point
+        self.since_check = 0
+        self.pending = [] # candidates above the threshold, not decided yet: (label, start, end, score)
+        self.emitted = []
+        self.blocked_until = -1 # resampled index, windows can't start before it (already emitted)
+
+    # ----- INCREMENTAL RESAMPLING ----- #
+
+    def add(self, x, y, t=None) -> list:
+        """Add a raw point (t in sec, EVENT_INTERVAL per point without it), returns the events that are final now"""
+        point = (float(x), float(y))
+        index = self.raw_count
+        self.raw_count += 1
+        self.now = index * EVENT_INTERVAL if t is None else float(t)
+
+        if self.last is None:
+            self.append(point[0], point[1], index)
+            self.last = point
+            return []
+
+        events = []
+        n = self.n
+        # walk along the segment last -> point and put down a resampled point every SPACING px
+        dx = point[0] - self.last[0]
+        dy = point[1] - self.last[1]
+        length = math.hypot(dx, dy)
+        walked = self.spacing - self.carry
+        while walked <= length:
+            f = walked / length
+            self.append(self.last[0] + f * dx, self.last[1] + f * dy, index)
+            walked += self.spacing
+            self.since_check += 1
+            if self.since_check >= self.hop:
+                self.since_check = 0
+                events += self.check()
+        self.carry = length - (walked - self.spacing)
+        self.last = point
+
+        # the pen stands still: score the windows left from the last hop, then the time decides
+        if self.n == n:
+            if self.since_check > 0:
+                self.since_check = 0
+                events += self.check()
+            elif len(self.pending) > 0:
+                events += self.decide(self.ready_until())
+        return events
+
+    def append(self, x, y, index):
+        if self.n == len(self.stream):
+            grown = np.empty((len(self.stream) * 2, 4))
+            grown[:self.n] = self.stream[:self.n]
+            self.stream = grown
+        self.stream[self.n] = (x, y, index, self.now)
+        self.n += 1
+
+    def finish(self) -> list:
+        """End of the stream, emit what is left"""
+        return self.check() + self.decide(self.n)
+
+    # ----- WINDOWS ----- #
+
+    def windows(self):
+        """The last w resampled points for every window length, sampled down to NUM_POINTS.
+        The stream is already equidistant, so this is an index interpolation instead of a new resampling"""
+        w = np.array(self.window_lengths)
+        usable = (w <= self.n) & (self.n - w >= self.blocked_until)
+        if not np.any(usable):
+            return [], None
+        at = self.n + self.sample_at[usable]
+        lo = at.astype(int)
+        hi = np.minimum(lo + 1, self.n - 1)
+        f = (at - lo)[:, :, None]
+        batch = self.stream[lo, :2] * (1 - f) + self.stream[hi, :2] * f
+        return list(w[usable]), batch
+
+    def preprocess_batch(self, batch):
+        """Recognizer.preprocess for all windows at once (rotate, scale, translate)"""
+        centroid = batch.mean(axis=1, keepdims=True)
+        angle = np.arctan2(centroid[:, 0, 1] - batch[:, 0, 1], centroid[:, 0, 0] - batch[:, 0, 0])
+        cos = np.cos(-angle)[:, None]
+        sin = np.sin(-angle)[:, None]
+        dx = batch[:, :, 0] - centroid[:, :, 0]
+        dy = batch[:, :, 1] - centroid[:, :, 1]
+        x = dx * cos - dy * sin + centroid[:, :, 0]
+        y = dx * sin + dy * cos + centroid[:, :, 1]
+
+        size = self.recognizer.square_size
+        width = np.maximum(x.max(1) - x.min(1), 1e-6)[:, None]
+        height = np.maximum(y.max(1) - y.min(1), 1e-6)[:, None]
+        x = x * (size / width)
+        y = y * (size / height)
+        x -= x.mean(1, keepdims=True)
+        y -= y.mean(1, keepdims=True)
+        return np.stack([x, y], axis=2)
+
+    def score_windows(self) -> list:
+        """(template, start, end, $1 score) for the current windows, start/end in resampled points.
+        All (window, template) pairs of a hop go to the kernel in one batch"""
+        lengths, batch = self.windows()
+        if len(lengths) == 0:
+            return []
+        windows = []
+        templates = []
+        for k, w in enumerate(lengths):
+            windows += [k] * len(self.pairs[w])
+            templates += self.pairs[w]
+
+        rec = self.recognizer
+        points = self.preprocess_batch(batch)[windows]
+        if self.closed_kernel is not None:
+            distances = self.closed_kernel(points, self.templates[templates], -rec.angle_range,
+                                           +rec.angle_range)
+        elif self.batch_kernel is not None:
+            distances = self.batch_kernel(points, self.templates[templates], -rec.angle_range,
+                                          +rec.angle_range, rec.angle_precision, rec.phi)
+        else:
+            distances = [rec.distance_at_best_angle(p, self.templates[t], -rec.angle_range,
+                                                    +rec.angle_range, rec.angle_precision)
+                         for p, t in zip(points, templates)]
+        return [(t, self.n - lengths[k], self.n - 1, 1.0 - d / rec.half_diagonal)
+                for k, t, d in zip(windows, templates, distances)]
+
+    def check(self) -> list:
+        """Score the current windows (normalized by the template's background), returns the final events"""
+        if self.log is not None:
+            self.log += [(t, self.raw_index(start), self.raw_index(end), score)
+                         for t, start, end, score in self.score_windows()]
+            return []
+
+        for t, start, end, score in self.score_windows():
+            score = (score - self.background[t]) / (1.0 - self.background[t])
+            if score >= self.threshold:
+                self.pending.append((self.labels[t], start, end, score))
+        return self.decide(self.ready_until())
+
+    def ready_until(self) -> int:
+        """Last resampled index whose candidates are final: MAX_DELAY points or MAX_DELAY_MS ago"""
+        times = self.stream[:self.n, 3]
+        timed_out = np.searchsorted(times, self.now - self.max_delay_ms / 1000, side="right") - 1
+        return max(self.n - 1 - self.max_delay, timed_out)
+
+    def decide(self, ready_until:int) -> list:
+        """Greedy non-maximum suppression over the pending candidates, best score first.
+        A candidate is emitted once it ends before ready_until and no better candidate overlaps it
+        (bounded latency: MAX_DELAY points or MAX_DELAY_MS after its end it counts as final)"""
+        events = []
+        holders = [] # better candidates that aren't ready yet
+        keep = []
+        for candidate in sorted(self.pending, key=lambda c: -c[3]):
+            if any(overlaps(candidate, e) for e in self.emitted):
+                continue # suppressed for good
+            if any(overlaps(candidate, h) for h in holders) or candidate[2] > ready_until:
+                holders.append(candidate)
+                keep.append(candidate)
+                continue
+            events.append(self.emit(candidate))
+        self.pending = [c for c in keep if not any(overlaps(c, e) for e in self.emitted)]
+        return events
+
+    def calibrate(self, strokes:list, percentile=BACKGROUND_PERCENTILE, seed=0):
+        """Background score per template, from a session of labelled strokes: [(label, raw points), ...]"""
+        points, truth = make_session(strokes, np.random.default_rng(seed))
+        self.reset()
+        self.log = []
+        for x, y in points:
+            self.add(x, y)
+        self.check()
+        log = self.log
+        self.log = None
+        self.reset()
+
+        for t, label in enumerate(self.labels):
+            scores = [score for u, start, end, score in log
+                      if u == t and not covers(label, start, end, truth)]
+            if len(scores) > 0:
+                self.background[t] = min(np.percentile(scores, percentile), 0.99)
+        return self
+
+    def raw_index(self, i:int) -> int:
+        return int(self.stream[i, 2])
+
+    def emit(self, candidate):
+        label, start, end, score = candidate
+        self.emitted.append((label, start, end, score))
+        self.emitted = self.emitted[-8:] # older ones can't overlap new windows anymore
+        self.blocked_until = max(self.blocked_until, end + 1)
+        # resampled -> raw point indices
+        return (label, self.raw_index(start), self.raw_index(end), score)
+
+
+# ----- EVALUATION ----- #
+
+def overlaps(a, b) -> bool:
+    """Do two (label, start, end, score) events share points"""
+    return a[1] <= b[2] and b[1] <= a[2]
+
+def covers(label:str, start:int, end:int, truth:list) -> bool:
+    """Does (start, end) cover at least half of a gesture with this label"""
+    for t_label, t_start, t_end in truth:
+        if t_label == label and min(end, t_end) - max(start, t_start) >= 0.5 * (t_end - t_start):
+            return True
+    return False
+
+def make_session(strokes:list, rng, gap=150):
+    """Join strokes into one long drag: every stroke moved next to the last one, connected by a straight line.
+    Returns the points + (label, start, end) of every stroke"""
+    points = []
+    truth = []
+    x_offset = 0.0
+    for label, stroke in strokes:
+        stroke = stroke - stroke.min(0) + [x_offset, rng.uniform(0, 100)]
+        if len(points) > 0:
+            # connecting line, sampled like a mouse drag
+            a = points[-1]
+            b = stroke[0]
+            steps = max(int(math.hypot(*(b - a)) / 6), 1)
+            points += [a + (b - a) * s / steps for s in range(1, steps)]
+        truth.append((label, len(points), len(points) + len(stroke) - 1))
+        points += list(stroke)
+        x_offset = stroke[:, 0].max() + gap
+    return np.array(points), truth
+
+def pen_stop_delay(spotter:GestureSpotter, stroke, events=200) -> float:
+    """One stroke, then the pen stands still for some events: ms until the stroke is emitted (inf = never)"""
+    spotter.reset()
+    for i, (x, y) in enumerate(stroke):
+        spotter.add(x, y, i * EVENT_INTERVAL)
+    end = len(stroke) - 1
+    for i in range(len(stroke), len(stroke) + events):
+        if len(spotter.add(x, y, i * EVENT_INTERVAL)) > 0:
+            spotter.reset()
+            return (i - end) * EVENT_INTERVAL * 1000
+    spotter.reset()
+    return np.inf
+
+def evaluate_spotting(folderpath=TEST_OWN_PATH, strokes=40, seed=0, threshold=THRESHOLD, backend="auto",
+                      closed_angle=CLOSED_ANGLE):
+    """Spot gestures in a session made of recorded strokes.
+    Templates: the first recording of every label, half of the others calibrate, the rest is tested"""
+    rng = np.random.default_rng(seed)
+    data = Parser.read_csv_files(folderpath)
+    templates = {}
+    rest = []
+    for label, points in data:
+        if label in templates:
+            rest.append((label, points))
+        else:
+            templates[label] = points
+
+    order = rng.permutation(len(rest))
+    calibration = [rest[i] for i in order[:len(rest) // 2]]
+    test = [rest[i] for i in order[len(rest) // 2:]][:strokes]
+    points, truth = make_session(test, rng)
+
+    spotter = GestureSpotter(list(templates.items()), threshold=threshold, closed_angle=closed_angle,
+                             backend=backend)
+    spotter.calibrate(calibration, seed=seed + 1)
+
+    events = []
+    delays = []
+    start = time.perf_counter()
+    for i, (x, y) in enumerate(points):
+        for event in spotter.add(x, y, i * EVENT_INTERVAL):
+            events.append(event)
+            delays.append((i - event[2]) * EVENT_INTERVAL * 1000) # ms between the gesture end and its event
+    events += spotter.finish()
+    duration = time.perf_counter() - start
+    stop_delay = pen_stop_delay(spotter, test[0][1])
+
+    # an event is a hit if it covers at least half of a not yet found stroke with its label
+    hits = 0
+    found = set()
+    for label, s, e, _ in events:
+        for k, (t_label, t_start, t_end) in enumerate(truth):
+            if k not in found and covers(label, s, e, [truth[k]]):
+                hits += 1
+                found.add(k)
+                break
+
+    print(f"{len(points)} points, {len(truth)} gestures, {len(events)} events")
+    print(f"precision: {hits / max(len(events), 1):.3f} recall: {hits / len(truth):.3f}")
+    print(f"{len(points) / duration:.0f} points/sec ({duration / len(points) * 1e6:.0f}us per point)")
+    if len(delays) > 0:
+        print(f"delay after the gesture end: mean {np.mean(delays):.0f}ms max {np.max(delays):.0f}ms")
+    print(f"one gesture, then the pen stops: event after {stop_delay:.0f}ms")
+    return events, truth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spot gestures in a long stream of recorded strokes")
+    parser.add_argument("--data", default=TEST_OWN_PATH)
+    parser.add_argument("--strokes", type=int, default=40)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--search-angle", action="store_true",
+                        help="golden section search for the angle instead of the closed form")
+    args = parser.parse_args()
+    evaluate_spotting(args.data, args.strokes, threshold=args.threshold, backend=args.backend,
+                      closed_angle=not args.search_angle)
@@ -0,0 +1,275 @@
+# hyperparameter sweep for the LSTM from unistroke-gestures.ipynb
+# trains the model variants in a process pool and logs them like the notebook does
+import argparse
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+from scipy.signal import resample
+from sklearn.preprocessing import StandardScaler
+
+PATH_TRAIN = "dataset/xml_logs"
+LOG_DIR = "logs"
+NOTES_PATH = f"{LOG_DIR}/accs.csv"
+SUMM_PATH = f"{LOG_DIR}/summaries.txt"
+
+NUM_POINTS = 50
+EPOCHS = 10
+BATCH_SIZE = 32
+LATENCY_RUNS = 200 # single sample predictions for the percentiles
+
+# the variants from the notebook (see: "Systematic Approach")
+PRESETS = {"default": {"neurons": 64, "dropout": 0.0},
+           "dropout": {"neurons": 64, "dropout": 0.2},
+           "half": {"neurons": 32, "dropout": 0.2},
+           "quarter": {"neurons": 16, "dropout": 0.2},
+           "mid-half-quarter": {"neurons": 24, "dropout": 0.2}}
+
+# ----- DATA ----- #
+
+def read_dataset(path:str):
+    """via: read_dataset() in unistroke-gestures.ipynb"""
+    data = []
+
+    for root, subdirs, files in os.walk(path):
+        if 'ipynb_checkpoint' in root:
+            continue
+
+        for f in files:
+            if '.xml' in f:
+                fname = f.split('.')[0]
+                label = fname[:-2]
+
+                xml_root = ET.parse(f'{root}/{f}').getroot()
+
+                points = []
+                for element in xml_root.findall('Point'):
+                    x = element.get('X')
+                    y = element.get('Y')
+                    points.append([x, y])
+
+                points = np.array(points, dtype=float)
+
+                scaler = StandardScaler()
+                points = scaler.fit_transform(points)
+
+                resampled = resample(points, NUM_POINTS)
+
+                data.append((label, resampled))
+    return data
+
+def config_name(neurons:int, dropout:float) -> str:
+    """Name a grid config, reusing the notebook names where they match"""
+    for name, preset in PRESETS.items():
+        if preset["neurons"] == neurons and preset["dropout"] == dropout:
+            return name
+    if dropout > 0:
+        return f"lstm-{neurons}-dropout-{dropout}"
+    return f"lstm-{neurons}"
+
+def logged_models(notes_path=NOTES_PATH) -> set:
+    if not os.path.exists(notes_path):
+        return set()
+    return set(pd.read_csv(notes_path)["model"])
+
+# ----- WORKER ----- #
+
+def init_worker(threads:int):
+    """Pin every worker to a fixed thread budget (before tensorflow is imported)"""
+    for var in ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                "TF_NUM_INTRAOP_THREADS"]:
+        os.environ[var] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+def train_config(name:str, neurons:int, dropout:float, threads:int, seed=42) -> dict:
+    """Train + evaluate one variant. Runs in a worker process, returns everything to log"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from keras.models import Sequential
+    from keras.layers import Input, Dense, LSTM, Dropout
+    from keras.callbacks import ReduceLROnPlateau, EarlyStopping
+    from keras.utils import to_categorical, set_random_seed
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import confusion_matrix, accuracy_score
+
+    set_random_seed(seed)
+
+    data = read_dataset(PATH_TRAIN)
+    labels = [sample[0] for sample in data]
+    encoder = LabelEncoder()
+    y = to_categorical(encoder.fit_transform(labels))
+    X = np.array([sample[1] for sample in data])
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+    # same architecture as the notebook
+    model = Sequential()
+    model.add(Input((NUM_POINTS, 2)))
+    model.add(LSTM(neurons))
+    model.add(Dense(32, activation='relu'))
+    if dropout > 0:
+        model.add(Dropout(dropout))
+    model.add(Dense(len(encoder.classes_), activation='softmax'))
+    model.compile(loss='categorical_crossentropy', optimizer='adam', metrics=['accuracy'])
+
+    reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=2, min_lr=0.0001)
+    stop_early = EarlyStopping(monitor='val_loss', patience=3)
+
+    history = model.fit(X_train, y_train, epochs=EPOCHS, batch_size=BATCH_SIZE,
+                        validation_data=(X_test, y_test), verbose=0,
+                        callbacks=[reduce_lr, stop_early])
+
+    # batch inference time (the "inference time" column of the notebook)
+    start = time.time()
+    y_predictions = model.predict(X_test, verbose=0)
+    inf_time = time.time() - start
+
+    y_predictions = np.argmax(y_predictions, axis=1)
+    y_test_labels = np.argmax(y_test, axis=1)
+    acc_score = accuracy_score(y_test_labels, y_predictions)
+    conf_matrix = confusion_matrix(y_test_labels, y_predictions)
+
+    # single stroke latency, like in the app (call the model directly, predict() adds overhead)
+    latencies = []
+    for i in range(min(LATENCY_RUNS, len(X_test))):
+        sample = X_test[i:i+1]
+        start = time.perf_counter()
+        model(sample, training=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+    summary = []
+    model.summary(print_fn=lambda x, **kwargs: summary.append(x))
+
+    return {"name": name,
+            "row": {"model": name, "accuracy score": acc_score,
+                    "inference time": inf_time, "trainable params": model.count_params(),
+                    "neurons": neurons, "dropout": dropout,
+                    "latency p50 ms": p50, "latency p95 ms": p95, "latency p99 ms": p99,
+                    # the notebook rows were evaluated on the training data, these on a held out split
+                    "evaluated on": "held-out 20%"},
+            "history": {k: [float(v) for v in vals] for k, vals in history.history.items()},
+            "conf": conf_matrix.tolist(),
+            "summary": summary}
+
+# ----- LOGGING ----- #
+
+def append_row(notes_path:str, row:dict):
+    """Append a row to the table. Existing rows are kept as they are (no float round trip),
+    new columns only extend the header + get empty fields in the old rows"""
+    if not os.path.exists(notes_path):
+        with open(notes_path, 'w', encoding="utf-8") as f:
+            f.write(",".join(["id"] + list(row)) + "\n")
+
+    with open(notes_path, encoding="utf-8") as f:
+        text = f.read()
+    lines = text.splitlines()
+    header = lines[0].split(",")
+    rows = [line for line in lines[1:] if line != ""]
+
+    missing = [column for column in row if column not in header]
+    if len(missing) > 0:
+        header += missing
+        lines = [",".join(header)] + [line + "," * len(missing) for line in rows]
+        with open(notes_path, 'w', encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    values = [str(len(rows))]
+    for column in header[1:]:
+        value = row.get(column, "")
+        values.append(repr(float(value)) if isinstance(value, (float, np.floating)) else str(value))
+    with open(notes_path, 'a', encoding="utf-8") as f:
+        if len(missing) == 0 and not text.endswith("\n"):
+            f.write("\n")
+        f.write(",".join(values) + "\n")
+
+def log_result(result:dict, log_dir=LOG_DIR):
+    """Write a result the same way the notebook's "Save logs" cell does"""
+    name = result["name"]
+    notes_path = f"{log_dir}/accs.csv"
+
+    append_row(notes_path, result["row"])
+
+    with open(f"{log_dir}/{name}-history.json", 'w') as f:
+        json.dump(result["history"], f, indent=4)
+
+    with open(f"{log_dir}/{name}-conf.json", 'w') as f:
+        json.dump(result["conf"], f, indent=4)
+
+    with open(f"{log_dir}/summaries.txt", 'a', encoding="utf-8") as fh:
+        fh.write(f"{name}\n")
+        for line in result["summary"]:
+            fh.write(line + '\n')
+
+# ----- SWEEP ----- #
+
+def build_configs(neurons:list, dropouts:list) -> list:
+    configs = []
+    for n in neurons:
+        for d in dropouts:
+            configs.append((config_name(n, d), n, d))
+    return configs
+
+def has_training_data(path=PATH_TRAIN) -> bool:
+    for root, subdirs, files in os.walk(path):
+        if any('.xml' in f for f in files):
+            return True
+    return False
+
+def run_sweep(configs:list, workers=2, threads=1, log_dir=LOG_DIR):
+    done = logged_models(f"{log_dir}/accs.csv")
+    todo = [c for c in configs if c[0] not in done]
+    for name, _, _ in configs:
+        if name in done:
+            print(f"skip {name} (already logged)")
+
+    if len(todo) == 0:
+        print("nothing to train")
+        return
+
+    # the training set isn't in the repo (see: dataset/README.md), every worker would fail without it
+    if not has_training_data(PATH_TRAIN):
+        sys.exit(f"no .xml gestures in {PATH_TRAIN}, add the training set first (see: dataset/README.md)")
+
+    # spawn: tensorflow is not fork safe
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=init_worker, initargs=(threads,)) as pool:
+        futures = {pool.submit(train_config, name, n, d, threads): name for name, n, d in todo}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"{name} failed: {e}")
+                continue
+            # only the main process writes the logs
+            log_result(result, log_dir)
+            row = result["row"]
+            print(f"{name}: acc={row['accuracy score']:.4f} "
+                  f"p50={row['latency p50 ms']:.2f}ms params={row['trainable params']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train LSTM variants and log them to logs/")
+    parser.add_argument("--neurons", type=int, nargs="+", default=None,
+                        help="neuron counts to try (default: the notebook presets)")
+    parser.add_argument("--dropout", type=float, nargs="+", default=[0.0, 0.2])
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    args = parser.parse_args()
+
+    if args.neurons is None:
+        configs = [(name, p["neurons"], p["dropout"]) for name, p in PRESETS.items()]
+    else:
+        configs = build_configs(args.neurons, args.dropout)
+
+    run_sweep(configs, args.workers, args.threads)
@@ -0,0 +1,136 @@
+# pre-rendered tones for gesture-application.py
+# renders the pitch envelopes of the Tone.*_wave functions once and mixes them into one output stream
+import threading
+import numpy as np
+import sounddevice as sd
+
+SAMPLERATE = 44100
+BLOCKSIZE = 512
+MIDDLE_C = 261.625565 # pysinewave: pitch 0 = middle c, 1 pitch = 1 semitone
+FADE = 0.01 # sec, avoids clicks at the start/end of a note
+
+# envelopes: (start pitch, pitch_per_second, [(target pitch, hold in sec), ...])
+# same values as the SineWave + sleep() calls they replace
+ENVELOPES = {"v": (12, 60, [(12, 1), (0, 1), (12, 2)]),
+             "pigtail": (-4, 120, [(-4, 1), (8, 1), (-2, 2)]),
+             "circle": (6, 10, [(6, 1), (-6, 1), (6, 2)]),
+             "star": (-6, 20, [(-6, 1), (12, 1), (-6, 1), (4, 1), (6, 1), (-8, 2)]),
+             "oops": (4, 150, [(4, 0.5), (-2, 1)]),
+             "test": (12, 10, [(12, 2), (-5, 3)])}
+
+# envelopes that were not played at the app VOLUME (the old test_wave used set_volume(-1))
+VOLUMES = {"test": -1}
+
+
+def volume_to_amplitude(decibels):
+    """pysinewave: +10 dB = double the amplitude"""
+    return 2 ** (decibels / 10)
+
+def render_envelope(start:float, pitch_per_second:float, steps:list, volume=-5, samplerate=SAMPLERATE):
+    """Render a pitch envelope into a float32 PCM buffer.
+    The pitch glides towards each target with pitch_per_second, like SineWave.set_pitch()"""
+    pitches = []
+    pitch = start
+    for target, hold in steps:
+        t = np.arange(int(hold * samplerate)) / samplerate
+        step = np.clip(pitch_per_second * t, 0, abs(target - pitch))
+        pitches.append(pitch + np.sign(target - pitch) * step)
+        if len(step) > 0:
+            pitch = pitches[-1][-1]
+    pitches = np.concatenate(pitches)
+
+    # integrate the frequency to get a continuous phase
+    freqs = MIDDLE_C * 2 ** (pitches / 12)
+    phase = 2 * np.pi * np.cumsum(freqs) / samplerate
+    buffer = np.sin(phase) * volume_to_amplitude(volume)
+
+    fade = min(int(FADE * samplerate), len(buffer) // 2)
+    ramp = np.linspace(0, 1, fade)
+    buffer[:fade] *= ramp
+    buffer[len(buffer) - fade:] *= ramp[::-1]
+    return buffer.astype(np.float32)
+
+
+class ToneEngine:
+    """Caches the rendered envelopes and plays them through one persistent OutputStream"""
+
+    def __init__(self, volume=-5, samplerate=SAMPLERATE) -> None:
+        self.volume = volume
+        self.samplerate = samplerate
+        self.buffers = {}
+        self.voices = [] # [buffer, start frame]
+        self.frame = 0 # frames written to the device so far
+        self.queue_end = 0 # frame where the last queued note ends
+        self.lock = threading.Lock()
+        self.stream = None
+
+    def start(self):
+        if self.stream is None:
+            self.stream = sd.OutputStream(samplerate=self.samplerate, channels=1, dtype="float32",
+                                          blocksize=BLOCKSIZE, callback=self.callback)
+            self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def get_buffer(self, name:str):
+        """Render a tone on first use, afterwards it comes from the cache"""
+        if name not in self.buffers:
+            start, pitch_per_second, steps = ENVELOPES[name]
+            volume = VOLUMES.get(name, self.volume)
+            self.buffers[name] = render_envelope(start, pitch_per_second, steps,
+                                                 volume, self.samplerate)
+        return self.buffers[name]
+
+    def prerender(self):
+        for name in ENVELOPES:
+            self.get_buffer(name)
+
+    def play(self, name:str):
+        """Mix a tone in right away (on top of whatever is playing)"""
+        self.add_voice(self.get_buffer(name), queued=False)
+
+    def enqueue(self, names:list):
+        """Play tones one after another, after the already queued ones"""
+        if len(names) == 0:
+            return
+        song = np.concatenate([self.get_buffer(name) for name in names])
+        self.add_voice(song, queued=True)
+
+    def add_voice(self, buffer, queued:bool):
+        self.start()
+        with self.lock:
+            start = max(self.frame, self.queue_end) if queued else self.frame
+            self.voices.append([buffer, start])
+            if queued:
+                self.queue_end = start + len(buffer)
+
+    def clear(self):
+        with self.lock:
+            self.voices = []
+            self.queue_end = self.frame
+
+    def callback(self, outdata, frames, time, status):
+        """sounddevice callback: mix every voice that overlaps this block"""
+        out = np.zeros(frames, dtype=np.float32)
+        with self.lock:
+            block_start = self.frame
+            block_end = block_start + frames
+            active = []
+            for buffer, start in self.voices:
+                end = start + len(buffer)
+                if end <= block_start:
+                    continue # done
+                active.append([buffer, start])
+                if start >= block_end:
+                    continue # not yet
+                lo = max(start, block_start)
+                hi = min(end, block_end)
+                out[lo - block_start:hi - block_start] += buffer[lo - start:hi - start]
+            self.voices = active
+            self.frame = block_end
+        np.clip(out, -1, 1, out=out)
+        outdata[:, 0] = out